@@ -0,0 +1,420 @@
+"""
+TIELBEKE BEZOEKERSREGISTRATIE - KIOSK API
+=========================================
+
+Lichte JSON/HTTP API voor kiosk-tablets en koppelingen (bijv. toegangspoortjes),
+los van de Streamlit interface. Gebruikt dezelfde data functies als balie4.py;
+database toegang loopt via een thread pool zodat de asyncio event loop nooit blokkeert.
+
+OPSTARTEN:
+----------
+   python balie_api.py --host 0.0.0.0 --port 8502
+
+ENDPOINTS:
+----------
+   POST /api/bezoekers                  Aanmelden, body: {"naam", "email", "telefoon",
+                                        "bedrijf", "bezoekt", "reden"}  -> 201 {"id": ...}
+                                        Optioneel "sleutel" (idempotentie, max. 100 tekens,
+                                        bijv. een UUID per formulier): opnieuw versturen na
+                                        een time-out geeft hetzelfde id, geen tweede bezoek
+                                        -> 202 {"id": null, "sleutel": ...} als de database
+                                        hapert: de aanmelding staat in het kiosk journaal
+   GET  /api/bezoekers                  Actieve bezoekers
+   GET  /api/zoek?q=jan                 Zoek actieve bezoeker op naam, e-mail of telefoon
+   GET  /api/profiel?sleutel=...        Terugkerende bezoeker op e-mailadres of telefoon:
+                                        bedrijf en host voor het formulier, naam/e-mail/telefoon
+                                        alleen gemaskeerd (de API heeft geen authenticatie)
+   GET  /api/hosts?q=pie                Autocomplete voor "Wie bezoek je?" (medewerkerslijst)
+   POST /api/bezoekers/<id>/afmelden    Afmelden (202 als het via het kiosk journaal later volgt)
+   POST /api/afmelden                   Afmelden met de gescande afmeld QR-code, body: {"code"}
+                                        (bijv. een QR-lezer bij de uitgang) -> 200 {"id", "afgemeld"}
+   GET  /api/bezoekers/<id>/badge.png   Bezoekersbadge voor de labelprinter (ook .pdf)
+   POST /api/groepen                    Groep aanmelden in één keer, body: {"namen": [contactpersoon,
+                                        ...], "email", "telefoon" (van de contactpersoon), "bedrijf",
+                                        "bezoekt", "reden"} -> 201 {"groep_id", "aantal"}; optioneel
+                                        "sleutel" (wordt het groep id), 202 als de database hapert
+   POST /api/groepen/<groep_id>/afmelden
+                                        Alle nog actieve leden van de groep afmelden
+   GET  /api/statistieken               Totaal, actief, uitgecheckt en gearchiveerd
+   GET  /evacuatie                      Evacuatielijst (BHV) als printbare HTML
+   GET  /evacuatie.pdf                  Evacuatielijst als PDF
+   GET  /metrics                        Prometheus metrics (latency per data functie)
+
+Alle endpoints accepteren ?locatie=<locatie> (standaard: de eerste locatie).
+Fouten komen terug als {"fout": ...}: 503 als de database bezet of niet bereikbaar is
+(later opnieuw proberen), 500 bij een onverwachte fout (details in het log).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import balie4
+import balie_evacuatie
+
+MAX_BODY = 64 * 1024
+MAX_SLEUTEL = 100
+GROEP_ID_PATROON = r'[\w.:-]{1,100}'
+
+logger = logging.getLogger('balie.api')
+REGISTRATIE_VELDEN = ['naam', 'email', 'telefoon', 'bedrijf', 'bezoekt', 'reden']
+
+# Database calls draaien in deze pool, nooit op de event loop
+_db_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='balie-db')
+
+# Payload die als bestand (eigen content type) wordt verstuurd in plaats van als JSON
+Document = namedtuple('Document', ['content_type', 'data'])
+
+
+class ApiFout(Exception):
+    """Fout die als JSON response met een HTTP status naar de client gaat"""
+
+    def __init__(self, status, melding):
+        super().__init__(melding)
+        self.status = status
+        self.melding = melding
+
+
+async def in_pool(functie, *args, **kwargs):
+    """Voer een (blokkerende) data functie uit in de database thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_pool, partial(functie, *args, **kwargs))
+
+
+# ===== HANDLERS =====
+async def aanmelden(locatie, query, body):
+    gegevens = {veld: str(body.get(veld) or '').strip() for veld in REGISTRATIE_VELDEN}
+    errors = balie4.valideer_registratie(**gegevens)
+    sleutel = str(body.get('sleutel') or '').strip() or None
+    if sleutel and len(sleutel) > MAX_SLEUTEL:
+        errors.append(f"Sleutel is te lang (maximaal {MAX_SLEUTEL} tekens)")
+    if errors:
+        raise ApiFout(HTTPStatus.UNPROCESSABLE_ENTITY, errors)
+    # Via het kiosk journaal: een haperende database houdt de kiosk niet op
+    sleutel = sleutel or os.urandom(16).hex()
+    bezoeker_id = await in_pool(balie4.voeg_bezoeker_toe_via_journaal, **gegevens, locatie=locatie,
+                                sleutel=sleutel)
+    if bezoeker_id is None:
+        return HTTPStatus.ACCEPTED, {'id': None, 'sleutel': sleutel}
+    return HTTPStatus.CREATED, {'id': bezoeker_id}
+
+
+async def groep_aanmelden(locatie, query, body):
+    gegevens = {veld: str(body.get(veld) or '').strip() for veld in REGISTRATIE_VELDEN if veld != 'naam'}
+    namen = body.get('namen')
+    if not isinstance(namen, list):
+        raise ApiFout(HTTPStatus.UNPROCESSABLE_ENTITY, ["Vul de namen in als lijst (contactpersoon eerst)"])
+    namen = [str(naam or '').strip() for naam in namen]
+    errors = balie4.valideer_groep(namen, **gegevens)
+    sleutel = str(body.get('sleutel') or '').strip() or None
+    if sleutel and not re.fullmatch(GROEP_ID_PATROON, sleutel):
+        errors.append(f"Sleutel mag alleen letters, cijfers en . : _ - bevatten (maximaal {MAX_SLEUTEL} tekens)")
+    if errors:
+        raise ApiFout(HTTPStatus.UNPROCESSABLE_ENTITY, errors)
+    groep_id, aantal = await in_pool(balie4.voeg_groep_toe_via_journaal, namen, **gegevens, locatie=locatie,
+                                     sleutel=sleutel)
+    if aantal is None:
+        return HTTPStatus.ACCEPTED, {'groep_id': groep_id, 'aantal': None}
+    return HTTPStatus.CREATED, {'groep_id': groep_id, 'aantal': aantal}
+
+
+async def actieve_bezoekers(locatie, query, body):
+    bezoekers = await in_pool(balie4.haal_actieve_bezoekers, locatie=locatie)
+    return HTTPStatus.OK, {'bezoekers': [b._asdict() for b in bezoekers]}
+
+
+async def zoeken(locatie, query, body):
+    zoekterm = query.get('q', [''])[0].strip()
+    if len(zoekterm) < 2:
+        raise ApiFout(HTTPStatus.BAD_REQUEST, "Vul minimaal 2 karakters in om te zoeken")
+    bezoekers = await in_pool(balie4.zoek_actieve_bezoeker, zoekterm, locatie=locatie)
+    return HTTPStatus.OK, {'bezoekers': [b._asdict() for b in bezoekers]}
+
+
+def _maskeer(tekst, zichtbaar=1):
+    """Alleen de eerste `zichtbaar` tekens van elk woord, de rest als *"""
+    return ' '.join(woord[:zichtbaar] + '*' * max(len(woord) - zichtbaar, 0) for woord in tekst.split(' '))
+
+
+def _maskeer_telefoon(telefoon):
+    """Alleen de laatste twee cijfers"""
+    cijfers = re.sub(r'\D', '', telefoon)
+    return '*' * max(len(cijfers) - 2, 0) + cijfers[-2:]
+
+
+async def profiel(locatie, query, body):
+    # Wie een e-mailadres of telefoonnummer raadt, mag hier geen persoonsgegevens uitlezen:
+    # alleen wat het formulier vooraf invult (bedrijf, host) en een gemaskeerde herkenning
+    sleutel = query.get('sleutel', [''])[0].strip()
+    gevonden = await in_pool(balie4.zoek_profiel, sleutel, locatie=locatie)
+    if gevonden is None:
+        raise ApiFout(HTTPStatus.NOT_FOUND, "Geen bezoekersprofiel gevonden")
+    lokaal, _, domein = gevonden.email.partition('@')
+    return HTTPStatus.OK, {'profiel': {
+        'naam': _maskeer(gevonden.naam),
+        'email': f"{_maskeer(lokaal)}@{domein}" if domein else _maskeer(lokaal),
+        'telefoon': _maskeer_telefoon(gevonden.telefoon),
+        'bedrijf': gevonden.bedrijf,
+        'bezoekt': gevonden.bezoekt,
+    }}
+
+
+async def hosts(locatie, query, body):
+    # De index staat in het geheugen, maar de versiecontrole (en soms het herladen) leest
+    # de database: via de thread pool, zodat de event loop daar nooit op wacht
+    gevonden = await in_pool(balie4.zoek_hosts, query.get('q', [''])[0], locatie=locatie)
+    return HTTPStatus.OK, {'hosts': [
+        {'id': host.id, 'naam': host.naam, 'afdeling': host.afdeling} for host in gevonden
+    ]}
+
+
+async def afmelden(locatie, query, body, bezoeker_id):
+    rows = await in_pool(balie4.checkout_via_journaal, int(bezoeker_id), locatie=locatie)
+    if rows == 0:
+        raise ApiFout(HTTPStatus.NOT_FOUND, f"Bezoeker {bezoeker_id} niet gevonden of al afgemeld")
+    if rows is None:
+        return HTTPStatus.ACCEPTED, {'afgemeld': True}
+    return HTTPStatus.OK, {'afgemeld': True}
+
+
+async def afmelden_met_code(locatie, query, body):
+    code = balie4.lees_afmeldcode(str(body.get('code') or ''))
+    if code is None:
+        raise ApiFout(HTTPStatus.UNPROCESSABLE_ENTITY, "Geen geldige afmeldcode")
+    if code[0] != locatie:
+        raise ApiFout(HTTPStatus.UNPROCESSABLE_ENTITY, f"Afmeldcode hoort bij locatie {code[0]}")
+    bezoeker_id = await in_pool(balie4.checkout_op_token_via_journaal, code[1], locatie=locatie)
+    if bezoeker_id == 0:
+        raise ApiFout(HTTPStatus.NOT_FOUND, "Afmeldcode onbekend of al afgemeld")
+    if bezoeker_id is None:
+        return HTTPStatus.ACCEPTED, {'id': None, 'afgemeld': True}
+    return HTTPStatus.OK, {'id': bezoeker_id, 'afgemeld': True}
+
+
+async def groep_afmelden(locatie, query, body, groep_id):
+    rows = await in_pool(balie4.checkout_groep_via_journaal, groep_id, locatie=locatie)
+    if rows == 0:
+        raise ApiFout(HTTPStatus.NOT_FOUND, f"Groep {groep_id} niet gevonden of al afgemeld")
+    if rows is None:
+        return HTTPStatus.ACCEPTED, {'afgemeld': None}
+    return HTTPStatus.OK, {'afgemeld': rows}
+
+
+async def badge(locatie, query, body, bezoeker_id, formaat):
+    bezoeker = await in_pool(balie4.haal_bezoeker, int(bezoeker_id), locatie=locatie)
+    if bezoeker is None:
+        raise ApiFout(HTTPStatus.NOT_FOUND, f"Bezoeker {bezoeker_id} niet gevonden")
+    token = await in_pool(balie4.haal_afmeld_token, bezoeker.id, locatie=locatie)
+    # Renderen is CPU werk: in de badge pool, niet in de database pool
+    loop = asyncio.get_running_loop()
+    badges = await loop.run_in_executor(
+        balie4.badge_pool(), partial(balie4.render_badge, bezoeker, locatie, (formaat,), token))
+    content_type = 'application/pdf' if formaat == 'pdf' else 'image/png'
+    return HTTPStatus.OK, Document(content_type, badges[formaat])
+
+
+async def statistieken(locatie, query, body):
+    totaal, actief, gearchiveerd = await in_pool(balie4.tel_bezoekers, locatie=locatie)
+    return HTTPStatus.OK, {
+        'totaal': totaal + gearchiveerd,
+        'actief': actief,
+        'uitgecheckt': totaal - actief,
+        'gearchiveerd': gearchiveerd,
+    }
+
+
+def _evacuatie_snapshot(locatie):
+    """In-memory snapshot van de achtergrond thread: geen database call, ook niet als de
+    database druk is, en nooit wachten op de event loop"""
+    snapshot = balie4.evacuatie_snapshots().snapshot(locatie, wachten=0)
+    if snapshot is None:
+        raise ApiFout(HTTPStatus.SERVICE_UNAVAILABLE, "Evacuatielijst wordt nog gemaakt, probeer het zo opnieuw")
+    return snapshot
+
+
+async def evacuatie_html(locatie, query, body):
+    snapshot = _evacuatie_snapshot(locatie)
+    return HTTPStatus.OK, Document('text/html; charset=utf-8',
+                                   balie_evacuatie.evacuatielijst_html(snapshot).encode('utf-8'))
+
+
+async def evacuatie_pdf(locatie, query, body):
+    snapshot = _evacuatie_snapshot(locatie)
+    return HTTPStatus.OK, Document('application/pdf', balie_evacuatie.evacuatielijst_pdf(snapshot))
+
+
+async def metrics(locatie, query, body):
+    return HTTPStatus.OK, balie4.prometheus_tekst()
+
+
+# (methode, pad-regex, handler); groepen uit de regex gaan als argumenten mee
+ROUTES = [
+    ('POST', re.compile(r'^/api/bezoekers$'), aanmelden),
+    ('GET', re.compile(r'^/api/bezoekers$'), actieve_bezoekers),
+    ('GET', re.compile(r'^/api/zoek$'), zoeken),
+    ('GET', re.compile(r'^/api/profiel$'), profiel),
+    ('GET', re.compile(r'^/api/hosts$'), hosts),
+    ('POST', re.compile(r'^/api/bezoekers/(\d+)/afmelden$'), afmelden),
+    ('POST', re.compile(r'^/api/afmelden$'), afmelden_met_code),
+    ('GET', re.compile(r'^/api/bezoekers/(\d+)/badge\.(png|pdf)$'), badge),
+    ('POST', re.compile(r'^/api/groepen$'), groep_aanmelden),
+    ('POST', re.compile(rf'^/api/groepen/({GROEP_ID_PATROON})/afmelden$'), groep_afmelden),
+    ('GET', re.compile(r'^/api/statistieken$'), statistieken),
+    ('GET', re.compile(r'^/evacuatie$'), evacuatie_html),
+    ('GET', re.compile(r'^/evacuatie\.pdf$'), evacuatie_pdf),
+    ('GET', re.compile(r'^/metrics$'), metrics),
+]
+
+
+async def verwerk_verzoek(methode, doel, ruwe_body):
+    """Route een verzoek naar de juiste handler; geeft (status, payload)"""
+    url = urlsplit(doel)
+    query = parse_qs(url.query)
+    locatie = query.get('locatie', [balie4.STANDAARD_LOCATIE])[0]
+
+    pad_gevonden = False
+    for route_methode, patroon, handler in ROUTES:
+        match = patroon.match(url.path)
+        if not match:
+            continue
+        pad_gevonden = True
+        if route_methode != methode:
+            continue
+        try:
+            if locatie not in balie4.LOCATIES:
+                raise ApiFout(HTTPStatus.BAD_REQUEST, f"Onbekende locatie: {locatie}")
+            try:
+                body = json.loads(ruwe_body) if ruwe_body else {}
+            except ValueError:
+                raise ApiFout(HTTPStatus.BAD_REQUEST, "Ongeldige JSON")
+            if not isinstance(body, dict):
+                raise ApiFout(HTTPStatus.BAD_REQUEST, "Body moet een JSON object zijn")
+            return await handler(locatie, query, body, *match.groups())
+        except ApiFout as fout:
+            return fout.status, {'fout': fout.melding}
+        except Exception as fout:
+            # Een kiosk krijgt altijd een JSON antwoord, nooit een verbroken verbinding
+            if balie4.database_bezet(fout):
+                logger.warning("Database bezet bij %s %s: %s", methode, url.path, fout)
+                return HTTPStatus.SERVICE_UNAVAILABLE, {'fout': "De database is bezet, probeer het zo opnieuw"}
+            logger.exception("Onverwachte fout bij %s %s", methode, url.path)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'fout': "Interne fout"}
+
+    if pad_gevonden:
+        return HTTPStatus.METHOD_NOT_ALLOWED, {'fout': "Methode niet toegestaan"}
+    return HTTPStatus.NOT_FOUND, {'fout': "Onbekend endpoint"}
+
+
+# ===== HTTP/1.1 SERVER (asyncio, standaardbibliotheek) =====
+async def lees_verzoek(reader):
+    """Lees één HTTP verzoek; geeft None als de client de verbinding sloot"""
+    verzoekregel = await reader.readline()
+    if not verzoekregel:
+        return None
+    methode, doel, versie = verzoekregel.decode('latin-1').split()
+
+    headers = {}
+    while True:
+        regel = await reader.readline()
+        if regel in (b'\r\n', b'\n', b''):
+            break
+        naam, waarde = regel.decode('latin-1').split(':', 1)
+        headers[naam.strip().lower()] = waarde.strip()
+
+    lengte = int(headers.get('content-length', 0))
+    if lengte > MAX_BODY:
+        raise ApiFout(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Verzoek te groot")
+    body = await reader.readexactly(lengte) if lengte else b''
+    return methode, doel, versie, headers, body
+
+
+def schrijf_response(writer, status, payload, keep_alive):
+    # Documenten met hun eigen content type, tekst (Prometheus) als text/plain, de rest als JSON
+    if isinstance(payload, Document):
+        content_type, data = payload
+    elif isinstance(payload, str):
+        data = payload.encode('utf-8')
+        content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        content_type = 'application/json; charset=utf-8'
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        f"\r\n".encode('latin-1') + data
+    )
+
+
+async def behandel_verbinding(reader, writer):
+    """Verwerk verzoeken op één (keep-alive) verbinding"""
+    try:
+        while True:
+            try:
+                verzoek = await lees_verzoek(reader)
+            except ApiFout as fout:
+                schrijf_response(writer, fout.status, {'fout': fout.melding}, False)
+                break
+            except ValueError:
+                schrijf_response(writer, HTTPStatus.BAD_REQUEST, {'fout': "Ongeldig HTTP verzoek"}, False)
+                break
+            if verzoek is None:
+                break
+
+            methode, doel, versie, headers, body = verzoek
+            status, payload = await verwerk_verzoek(methode, doel, body)
+            keep_alive = versie == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            schrijf_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+        await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    except Exception:
+        logger.exception("Verbinding afgebroken door een onverwachte fout")
+    finally:
+        writer.close()
+
+
+async def start_server(host='127.0.0.1', port=8502):
+    """Start de API server (voor gebruik binnen een bestaande event loop)"""
+    # Schema bootstrap vooraf, zodat het eerste kiosk-verzoek niet wacht
+    for locatie in balie4.LOCATIES:
+        await in_pool(balie4.get_database, locatie)
+    balie4.notificatie_workers()
+    balie4.evacuatie_snapshots()
+    balie4.badge_pool()
+    balie4.kiosk_journaal()
+    return await asyncio.start_server(behandel_verbinding, host, port)
+
+
+async def serve(host, port):
+    server = await start_server(host, port)
+    print(f"Kiosk API luistert op http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tielbeke kiosk API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
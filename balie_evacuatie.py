@@ -0,0 +1,276 @@
+"""
+TIELBEKE BEZOEKERSREGISTRATIE - EVACUATIELIJST (BHV)
+====================================================
+
+Printbare lijst van iedereen die op dit moment binnen is, gegroepeerd per host,
+als HTML of PDF. De lijst komt uit een snapshot die de app (balie4.py) en de
+kiosk API (balie_api.py) op de achtergrond continu bijwerken, zodat hij er in
+een noodsituatie direct is, ook als de interface traag is.
+
+Deze module importeert balie4 niet (geen Streamlit/pandas bij het opstarten).
+Alleen als er geen actuele snapshot is, wordt de lijst rechtstreeks uit de
+database opgehaald.
+
+De snapshot staat in BALIE_EVACUATIE_MAP (standaard de map evacuatie naast de
+app, alleen leesbaar voor de eigenaar) en is versleuteld (AES-GCM) met een
+sleutel afgeleid van BALIE_SLEUTEL / BALIE_SLEUTEL_BESTAND, net als de
+persoonsgegevens in de database. De app schrijft het bestand alleen opnieuw als
+er iemand is aan- of afgemeld, en raakt het anders elke controle alleen aan.
+
+GEBRUIK:
+--------
+   python balie_evacuatie.py                           PDF in evacuatie_<locatie>_<tijd>.pdf
+   python balie_evacuatie.py --formaat html --uit -    HTML naar stdout
+   python balie_evacuatie.py --locatie vestiging-noord --uit lijst.pdf
+"""
+
+import argparse
+import base64
+import functools
+import hashlib
+import hmac
+import html
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Een snapshot ouder dan dit (seconden) wordt niet vertrouwd: dan direct uit de database
+SNAPSHOT_MAX_LEEFTIJD = 60
+SNAPSHOT_MAP = os.environ.get('BALIE_EVACUATIE_MAP',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'evacuatie'))
+
+
+def snapshot_pad(locatie):
+    """Bestand waarin de app de actuele snapshot van een locatie bewaart"""
+    return os.path.join(SNAPSHOT_MAP, f"evacuatie_{locatie}.snapshot")
+
+
+def _lees_hoofdsleutel():
+    """Hoofdsleutel van balie4 (BALIE_SLEUTEL of het sleutelbestand), zonder balie4 te importeren"""
+    sleutel = os.environ.get('BALIE_SLEUTEL', '')
+    if not sleutel:
+        with open(os.environ.get('BALIE_SLEUTEL_BESTAND', 'balie.key'), encoding='ascii') as f:
+            sleutel = f.read().strip()
+    return base64.b64decode(sleutel)
+
+
+@functools.lru_cache(maxsize=None)
+def _snapshot_aes(hoofdsleutel):
+    """AES-GCM met een eigen sleutel, afgeleid van dezelfde hoofdsleutel als de database"""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    return AESGCM(hmac.new(hoofdsleutel, b'balie-evacuatie', hashlib.sha256).digest())
+
+
+def lees_snapshot(locatie, max_leeftijd=SNAPSHOT_MAX_LEEFTIJD):
+    """Snapshot van schijf, of None als die ontbreekt, te oud of onleesbaar is. De stand
+    is het moment van de laatste controle door de app (de wijzigingstijd van het bestand)."""
+    from cryptography.exceptions import InvalidTag
+    pad = snapshot_pad(locatie)
+    try:
+        gecontroleerd = os.path.getmtime(pad)
+        if time.time() - gecontroleerd > max_leeftijd:
+            return None
+        with open(pad, 'rb') as f:
+            ruw = f.read()
+        aes = _snapshot_aes(_lees_hoofdsleutel())
+        snapshot = json.loads(aes.decrypt(ruw[:12], ruw[12:], locatie.encode('utf-8')))
+    except (OSError, ValueError, InvalidTag):
+        return None
+    snapshot['tijdstip'] = datetime.fromtimestamp(gecontroleerd).strftime('%Y-%m-%d %H:%M:%S')
+    return snapshot
+
+
+def schrijf_snapshot(snapshot, hoofdsleutel):
+    """Schrijf een snapshot versleuteld en atomair weg (nooit een half bestand voor de CLI)"""
+    os.makedirs(SNAPSHOT_MAP, mode=0o700, exist_ok=True)
+    pad = snapshot_pad(snapshot['locatie'])
+    tijdelijk = f"{pad}.{os.getpid()}.{threading.get_ident()}.tmp"
+    nonce = os.urandom(12)
+    data = json.dumps(snapshot, ensure_ascii=False).encode('utf-8')
+    versleuteld = nonce + _snapshot_aes(hoofdsleutel).encrypt(nonce, data, snapshot['locatie'].encode('utf-8'))
+    fd = os.open(tijdelijk, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(versleuteld)
+    os.replace(tijdelijk, pad)
+
+
+def bevestig_snapshot(locatie):
+    """Markeer de snapshot op schijf als nog actueel (er is niemand aan- of afgemeld);
+    False als het bestand er niet (meer) is"""
+    try:
+        os.utime(snapshot_pad(locatie))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+# ===== HTML =====
+def evacuatielijst_html(snapshot):
+    """Zelfstandige, printbare HTML pagina"""
+    e = html.escape
+    delen = [f"""<!DOCTYPE html>
+<html lang="nl"><head><meta charset="utf-8">
+<title>Evacuatielijst {e(snapshot['locatie'])} {e(snapshot['tijdstip'])}</title>
+<style>
+  body {{ font-family: Arial, sans-serif; margin: 1.5cm; color: #000; }}
+  h1 {{ border-bottom: 3px solid #F00008; padding-bottom: .2em; }}
+  h2 {{ margin: 1.2em 0 .3em; font-size: 1.1em; }}
+  table {{ width: 100%; border-collapse: collapse; }}
+  th, td {{ border: 1px solid #999; padding: 4px 6px; text-align: left; }}
+  td.vink {{ width: 2.5em; }}
+  @media print {{ h2 {{ break-after: avoid; }} tr {{ break-inside: avoid; }} }}
+</style></head><body>
+<h1>Evacuatielijst &ndash; {e(snapshot['locatie'])}</h1>
+<p><strong>{snapshot['aantal']} aanwezige bezoeker(s)</strong> &middot; stand van {e(snapshot['tijdstip'])}</p>
+"""]
+    if not snapshot['groepen']:
+        delen.append("<p>Er zijn geen bezoekers aangemeld.</p>")
+    for groep in snapshot['groepen']:
+        afdeling = f" ({e(groep['afdeling'])})" if groep['afdeling'] else ""
+        delen.append(
+            f"<h2>Host: {e(groep['host'])}{afdeling} &ndash; {len(groep['bezoekers'])}</h2>\n"
+            "<table><tr><th>Naam</th><th>Bedrijf</th><th>Telefoon</th><th>Binnen sinds</th>"
+            "<th>Veilig</th></tr>\n"
+        )
+        for bezoeker in groep['bezoekers']:
+            delen.append(
+                f"<tr><td>{e(bezoeker['naam'])}</td><td>{e(bezoeker['bedrijf'])}</td>"
+                f"<td>{e(bezoeker['telefoon'])}</td><td>{e(bezoeker['tijdstip_in'][11:16])}</td>"
+                "<td class=\"vink\">&#9744;</td></tr>\n"
+            )
+        delen.append("</table>\n")
+    delen.append("</body></html>\n")
+    return ''.join(delen)
+
+
+# ===== PDF =====
+# Minimale PDF (A4, standaardfonts Helvetica/Helvetica-Bold, WinAnsi): geen extra
+# packages nodig en de tekst blijft selecteerbaar en scherp bij het printen.
+A4_BREEDTE, A4_HOOGTE = 595, 842
+MARGE = 50
+KOLOMMEN = [(MARGE, "Naam"), (MARGE + 150, "Bedrijf"), (MARGE + 290, "Telefoon"),
+            (MARGE + 390, "Binnen sinds"), (MARGE + 470, "Veilig")]
+
+
+def _pdf_tekst(tekst):
+    """Tekst als PDF string literal (cp1252, met escapes)"""
+    ruw = str(tekst).encode('cp1252', 'replace')
+    return b'(' + ruw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _pdf_document(paginas):
+    """Bouw een PDF uit paginas: lijsten met content stream operatoren (bytes)"""
+    objecten = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # pages, hieronder ingevuld
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    kinderen = []
+    for operatoren in paginas:
+        inhoud = b'\n'.join(operatoren)
+        objecten.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(inhoud), inhoud))
+        objecten.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>"
+            % (A4_BREEDTE, A4_HOOGTE, len(objecten))
+        )
+        kinderen.append(b"%d 0 R" % len(objecten))
+    objecten[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b' '.join(kinderen), len(kinderen))
+
+    uitvoer = bytearray(b"%PDF-1.4\n")
+    posities = []
+    for nummer, obj in enumerate(objecten, start=1):
+        posities.append(len(uitvoer))
+        uitvoer += b"%d 0 obj\n%s\nendobj\n" % (nummer, obj)
+    xref = len(uitvoer)
+    uitvoer += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objecten) + 1)
+    uitvoer += b''.join(b"%010d 00000 n \n" % positie for positie in posities)
+    uitvoer += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objecten) + 1, xref)
+    return bytes(uitvoer)
+
+
+def evacuatielijst_pdf(snapshot):
+    """Printbare PDF (A4), per host een blok met afvinkvakje per bezoeker"""
+    paginas = [[]]
+    y = A4_HOOGTE - MARGE
+
+    def tekst(x, y, waarde, vet=False, grootte=10):
+        paginas[-1].append(b"BT /%s %d Tf %d %d Td %s Tj ET" % (
+            b'F2' if vet else b'F1', grootte, x, y, _pdf_tekst(waarde)))
+
+    def ruimte(nodig):
+        nonlocal y
+        if y - nodig < MARGE:
+            paginas.append([])
+            y = A4_HOOGTE - MARGE
+
+    tekst(MARGE, y, f"Evacuatielijst - {snapshot['locatie']}", vet=True, grootte=18)
+    y -= 22
+    tekst(MARGE, y, f"{snapshot['aantal']} aanwezige bezoeker(s) - stand van {snapshot['tijdstip']}")
+    y -= 26
+    if not snapshot['groepen']:
+        tekst(MARGE, y, "Er zijn geen bezoekers aangemeld.")
+
+    for groep in snapshot['groepen']:
+        ruimte(50)
+        afdeling = f" ({groep['afdeling']})" if groep['afdeling'] else ""
+        tekst(MARGE, y, f"Host: {groep['host']}{afdeling} - {len(groep['bezoekers'])}", vet=True, grootte=12)
+        y -= 16
+        for x, kop in KOLOMMEN:
+            tekst(x, y, kop, vet=True, grootte=9)
+        y -= 14
+        for bezoeker in groep['bezoekers']:
+            ruimte(14)
+            waarden = [bezoeker['naam'][:28], bezoeker['bedrijf'][:26], bezoeker['telefoon'],
+                       bezoeker['tijdstip_in'][11:16]]
+            for (x, _), waarde in zip(KOLOMMEN, waarden):
+                tekst(x, y, waarde)
+            # Afvinkvakje
+            paginas[-1].append(b"%d %d 9 9 re S" % (KOLOMMEN[-1][0] + 8, y - 1))
+            y -= 14
+        y -= 10
+    return _pdf_document(paginas)
+
+
+# ===== CLI =====
+def haal_snapshot(locatie):
+    """Actuele snapshot: van schijf als die vers is, anders direct uit de database"""
+    snapshot = lees_snapshot(locatie)
+    if snapshot is not None:
+        return snapshot
+    print("Geen actuele snapshot; lijst wordt uit de database opgehaald", file=sys.stderr)
+    import balie4
+    return balie4.maak_evacuatie_snapshot(locatie)
+
+
+def main():
+    standaard_locatie = (os.environ.get('BALIE_LOCATIES', 'hoofdkantoor').split(',')[0].strip()
+                         or 'hoofdkantoor')
+    parser = argparse.ArgumentParser(description="Evacuatielijst (BHV) van alle aanwezige bezoekers")
+    parser.add_argument('--locatie', default=standaard_locatie)
+    parser.add_argument('--formaat', choices=['pdf', 'html'], default='pdf')
+    parser.add_argument('--uit', help="Bestandsnaam, of - voor stdout")
+    args = parser.parse_args()
+
+    snapshot = haal_snapshot(args.locatie)
+    if args.formaat == 'pdf':
+        data = evacuatielijst_pdf(snapshot)
+    else:
+        data = evacuatielijst_html(snapshot).encode('utf-8')
+
+    if args.uit == '-':
+        sys.stdout.buffer.write(data)
+        return 0
+    uit = args.uit or f"evacuatie_{args.locatie}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{args.formaat}"
+    with open(uit, 'wb') as f:
+        f.write(data)
+    print(f"{snapshot['aantal']} bezoeker(s), stand van {snapshot['tijdstip']}: {uit}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
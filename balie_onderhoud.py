@@ -0,0 +1,69 @@
+"""
+TIELBEKE BEZOEKERSREGISTRATIE - ONDERHOUD
+=========================================
+
+Onderhoudstaken van de app (balie4.py) voor een planner: cron, een systemd timer
+of de Windows Taakplanner. Dezelfde taken staan ook in de Admin tab. Ze werken in
+korte batches, dus de kiosks blijven gewoon bruikbaar terwijl een taak loopt.
+
+GEBRUIK:
+--------
+   python balie_onderhoud.py anonimiseren                  alle locaties, BALIE_ANONIMISEER_NA_DAGEN
+   python balie_onderhoud.py anonimiseren --dagen 730 --locatie vestiging-noord
+   python balie_onderhoud.py archiveren                    alle locaties, BALIE_ARCHIEF_NA_DAGEN
+
+Voorbeeld crontab (elke nacht om 03:15, in de map van de app):
+   15 3 * * * cd /opt/balie && python balie_onderhoud.py archiveren && python balie_onderhoud.py anonimiseren
+
+Anonimiseren houdt een checkpoint bij in de database: een afgebroken run gaat de
+volgende keer verder waar hij was. De exit code is 1 als een taak mislukt.
+"""
+
+import argparse
+import sys
+
+
+def anonimiseren(balie4, locatie, dagen):
+    verwerkt = 0
+    for verwerkt, _ in balie4.anonimiseer_bezoekers(dagen, locatie=locatie):
+        pass
+    return f"{verwerkt} bezoek(en) geanonimiseerd"
+
+
+def archiveren(balie4, locatie, dagen):
+    return f"{balie4.archiveer_bezoekers(dagen, locatie=locatie)} bezoek(en) gearchiveerd"
+
+
+# taak: (functie, standaard bewaartermijn in balie4)
+TAKEN = {
+    'anonimiseren': (anonimiseren, 'ANONIMISEER_NA_DAGEN'),
+    'archiveren': (archiveren, 'ARCHIEF_NA_DAGEN'),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Onderhoudstaken voor de bezoekersregistratie")
+    parser.add_argument('taak', choices=sorted(TAKEN))
+    parser.add_argument('--dagen', type=int, help="Bewaartermijn in dagen (standaard BALIE_ANONIMISEER_NA_DAGEN of BALIE_ARCHIEF_NA_DAGEN)")
+    parser.add_argument('--locatie', help="Alleen deze locatie (standaard alle locaties)")
+    args = parser.parse_args()
+    functie, standaard = TAKEN[args.taak]
+
+    # Pas na het parsen: --help blijft snel (geen Streamlit import)
+    import balie4
+    if args.locatie and args.locatie not in balie4.LOCATIES:
+        parser.error(f"onbekende locatie: {args.locatie} (BALIE_LOCATIES: {', '.join(balie4.LOCATIES)})")
+    dagen = args.dagen if args.dagen is not None else getattr(balie4, standaard)
+
+    fouten = 0
+    for locatie in [args.locatie] if args.locatie else balie4.LOCATIES:
+        try:
+            print(f"{locatie}: {functie(balie4, locatie, dagen)}", file=sys.stderr)
+        except Exception as e:
+            fouten += 1
+            print(f"{locatie}: {args.taak} mislukt: {e}", file=sys.stderr)
+    return 1 if fouten else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+TIELBEKE BEZOEKERSREGISTRATIE - MEERDERE WORKERS
+================================================
+
+Start N Streamlit processen van de app (balie4.py) op opeenvolgende poorten, achter
+een reverse proxy: een worker die vastloopt of crasht neemt niet de hele receptie mee,
+en de workers verdelen het werk over de CPU's van de server. Ze delen dezelfde
+database: SQLite in WAL mode (bestand op een lokale schijf van deze server, niet op
+een netwerkshare) of PostgreSQL (BALIE_DATABASE_URL).
+
+GEBRUIK:
+--------
+   python balie_workers.py                              4 workers, poort 8601-8604
+   python balie_workers.py --workers 2 --poort 8501
+   python balie_workers.py --workers 4 -- --server.maxUploadSize 10
+                                                        (na -- : extra Streamlit opties)
+
+Start in de map van de app (de SQLite bestanden en balie.key staan relatief daarin).
+Het schema en de sleutel worden eerst eenmalig aangemaakt, daarna starten de workers.
+Een worker die stopt wordt opnieuw gestart; stopt hij steeds meteen, dan met een
+oplopende wachttijd. Ctrl+C of SIGTERM stopt alle workers.
+
+REVERSE PROXY:
+--------------
+Een Streamlit sessie leeft in één worker (websocket): de proxy moet een browser steeds
+naar dezelfde worker sturen (sticky sessions). Caddy, met een cookie per browser:
+
+   balie.tielbeke.nl {
+       reverse_proxy 127.0.0.1:8601 127.0.0.1:8602 127.0.0.1:8603 127.0.0.1:8604 {
+           lb_policy cookie
+           health_uri /_stcore/health
+       }
+   }
+
+nginx, op IP-adres van de client (kiosks achter één NAT-adres komen zo op één worker):
+
+   upstream balie {
+       ip_hash;
+       server 127.0.0.1:8601;
+       server 127.0.0.1:8602;
+       server 127.0.0.1:8603;
+       server 127.0.0.1:8604;
+   }
+   server {
+       listen 80;
+       location / {
+           proxy_pass http://balie;
+           proxy_http_version 1.1;
+           proxy_set_header Upgrade $http_upgrade;
+           proxy_set_header Connection "upgrade";
+           proxy_set_header Host $host;
+           proxy_read_timeout 86400;
+       }
+   }
+
+Elke worker heeft zijn eigen achtergrond threads (notificaties, evacuatie snapshot,
+badges). Berichten uit de outbox worden per transactie geclaimd en gaan dus één keer
+weg. Controleer de opzet met: python benchmarks/stress_multiproces.py
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'balie4.py')
+
+# Een worker die binnen zoveel seconden stopt, telt als 'meteen gestopt'
+MIN_LOOPTIJD = 10
+MAX_HERSTART_WACHT = 60
+
+
+class Worker:
+    """Eén Streamlit proces op een vaste poort, dat na een crash opnieuw gestart wordt"""
+
+    def __init__(self, poort, host, extra):
+        self.poort = poort
+        self.commando = [
+            sys.executable, '-m', 'streamlit', 'run', APP,
+            '--server.port', str(poort),
+            '--server.address', host,
+            '--server.headless', 'true',
+            *extra,
+        ]
+        self.wacht = 1
+        self.herstart = None    # monotonic tijdstip van de geplande herstart
+        self.start()
+
+    def start(self):
+        self.proces = subprocess.Popen(self.commando)
+        self.gestart = time.monotonic()
+        self.herstart = None
+
+    def controleer(self, nu):
+        """Plan een herstart als het proces gestopt is, of voer een geplande herstart uit"""
+        if self.herstart is not None:
+            if nu >= self.herstart:
+                self.start()
+            return
+        if self.proces.poll() is None:
+            return
+        looptijd = nu - self.gestart
+        if looptijd < MIN_LOOPTIJD:
+            print(f"Worker {self.poort} stopte na {looptijd:.0f} s (exit {self.proces.returncode}), "
+                  f"herstart over {self.wacht} s", file=sys.stderr)
+            self.herstart = nu + self.wacht
+            self.wacht = min(self.wacht * 2, MAX_HERSTART_WACHT)
+        else:
+            print(f"Worker {self.poort} gestopt (exit {self.proces.returncode}), herstart", file=sys.stderr)
+            self.wacht = 1
+            self.start()
+
+    def stop(self):
+        if self.proces.poll() is None:
+            self.proces.terminate()
+
+
+def bereid_voor():
+    """Schema (migraties, WAL) en sleutel eenmalig aanmaken, vóór de workers starten"""
+    import balie4
+    for locatie in balie4.LOCATIES:
+        balie4.opslag(locatie)
+    balie4._sleutels()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start meerdere Streamlit workers van de bezoekersregistratie")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--poort', type=int, default=8601, help="Poort van de eerste worker")
+    parser.add_argument('--host', default='127.0.0.1', help="Adres om op te luisteren (de proxy praat hiermee)")
+    parser.add_argument('streamlit_opties', nargs=argparse.REMAINDER,
+                        help="Extra opties voor streamlit run (na --)")
+    args = parser.parse_args()
+    extra = [optie for optie in args.streamlit_opties if optie != '--']
+
+    bereid_voor()
+
+    stoppen = False
+
+    def stop(signum, frame):
+        nonlocal stoppen
+        stoppen = True
+    signal.signal(signal.SIGTERM, stop)
+
+    workers = [Worker(args.poort + i, args.host, extra) for i in range(args.workers)]
+    print(f"{args.workers} worker(s) op {args.host}:{args.poort}-{args.poort + args.workers - 1}", file=sys.stderr)
+    try:
+        while not stoppen:
+            for worker in workers:
+                worker.controleer(time.monotonic())
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            try:
+                worker.proces.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.proces.kill()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+STARTUP BENCHMARK
+=================
+
+Meet de import-tijd van balie4.py met `python -X importtime` en bewaak het
+startup-budget van de kiosk.
+
+GEBRUIK:
+--------
+   python benchmarks/bench_startup.py
+   python benchmarks/bench_startup.py --budget-ms 800 --top 15
+
+De exit code is 1 als de import boven het budget uitkomt of als een module
+die lazy geladen hoort te worden (pandas, qrcode, PIL, psycopg, pyarrow,
+cryptography) toch bij import wordt geladen.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules die pas bij eerste gebruik geladen mogen worden
+LAZY_MODULES = ['pandas', 'qrcode', 'PIL', 'psycopg', 'pyarrow', 'cryptography']
+
+
+def meet_importtime(module='balie4'):
+    """Importeer module in een schone interpreter en parse de -X importtime output"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import van {module} mislukt:\n{result.stderr}")
+
+    metingen = []
+    for regel in result.stderr.splitlines():
+        if not regel.startswith('import time:') or 'self [us]' in regel:
+            continue
+        # Formaat: "import time:   self [us] | cumulative | imported package"
+        self_us, cumulatief_us, naam = regel.split(':', 1)[1].split('|')
+        naam = naam[1:]
+        diepte = (len(naam) - len(naam.lstrip())) // 2
+        metingen.append((naam.strip(), int(self_us), int(cumulatief_us), diepte))
+    return metingen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-tijd rapport voor balie4.py")
+    parser.add_argument('--module', default='balie4')
+    parser.add_argument('--budget-ms', type=float, default=1000.0,
+                        help="Maximale cumulatieve import-tijd in milliseconden")
+    parser.add_argument('--top', type=int, default=10,
+                        help="Aantal zwaarste directe imports om te tonen")
+    args = parser.parse_args()
+
+    metingen = meet_importtime(args.module)
+    # -X importtime print kinderen vóór hun ouder: de directe imports van de
+    # module zijn de regels op diepte 1 tussen de vorige top-level regel en de module
+    index = next(i for i, m in enumerate(metingen) if m[0] == args.module and m[3] == 0)
+    start = max((i for i, m in enumerate(metingen[:index]) if m[3] == 0), default=-1) + 1
+    directe_imports = [m for m in metingen[start:index] if m[3] == 1]
+    totaal_ms = metingen[index][2] / 1000
+
+    print(f"Import-tijd {args.module}: {totaal_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"{'cumulatief (ms)':>16}  {'self (ms)':>10}  module")
+    for naam, self_us, cumulatief_us, _ in sorted(directe_imports, key=lambda m: -m[2])[:args.top]:
+        print(f"{cumulatief_us / 1000:>16.1f}  {self_us / 1000:>10.1f}  {naam}")
+
+    geladen = {m[0] for m in metingen}
+    eager = [naam for naam in LAZY_MODULES if naam in geladen]
+
+    ok = True
+    if eager:
+        print(f"FOUT: deze modules horen lazy geladen te worden: {', '.join(eager)}")
+        ok = False
+    if totaal_ms > args.budget_ms:
+        print(f"FOUT: import-tijd {totaal_ms:.1f} ms overschrijdt budget van {args.budget_ms:.0f} ms")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
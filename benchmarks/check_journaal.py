@@ -0,0 +1,142 @@
+"""
+KIOSK JOURNAAL CHECK
+====================
+
+Controleert het kiosk journaal van balie4.py tegen een SQLite database in een
+tijdelijke map, met een database die hapert: een tweede verbinding houdt het
+write-lock vast (zoals een netwerkshare die blijft hangen).
+
+- Aanmelden en afmelden op de kiosk blijven snel (hooguit JOURNAAL_WACHT) terwijl
+  de database hapert; de aanmeldingen staan in de wachtrij van het journaal
+- Als de database weer reageert, worden ze verwerkt: niets verloren, niets dubbel
+- Conflicten: een aanmelding die twee keer verwerkt wordt geeft hetzelfde id, een
+  afmelding van iemand die de receptie al had afgemeld houdt de eerste afmelding
+- Een regel die nooit kan (kapotte gegevens) gaat naar journaal_mislukt en houdt
+  de regels na hem niet op
+
+GEBRUIK:
+--------
+   python benchmarks/check_journaal.py
+   python benchmarks/check_journaal.py --aanmeldingen 50 --hapering 5
+
+De exit code is 1 als een controle faalt.
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def controles(balie4, aantal, hapering):
+    """(naam, verwacht, gekregen) per controle"""
+    locatie = balie4.STANDAARD_LOCATIE
+    journaal = balie4.kiosk_journaal()
+    uitkomsten = []
+    registreer = lambda i: balie4.voeg_bezoeker_toe_via_journaal(
+        f"Kiosk {i}", f"kiosk{i}@bedrijf.nl", f"0698765{i:03d}", "ABC", "Piet Pieters", "Overleg",
+        locatie=locatie, sleutel=f"kiosk-{i}")
+
+    # Database bereikbaar: de kiosk krijgt meteen het id
+    eerste = registreer(0)
+    uitkomsten.append(('aanmelden (database bereikbaar)', True, isinstance(eerste, int)))
+
+    # Database hapert: een andere verbinding houdt het write-lock vast
+    blokkade = sqlite3.connect(balie4.db_pad(locatie), isolation_level=None)
+    blokkade.execute("BEGIN IMMEDIATE")
+    latencies = []
+    try:
+        for i in range(1, aantal + 1):
+            begin = time.perf_counter()
+            registreer(i)
+            latencies.append(time.perf_counter() - begin)
+        begin = time.perf_counter()
+        balie4.checkout_via_journaal(eerste, locatie=locatie)
+        latencies.append(time.perf_counter() - begin)
+        wachtrij = len(journaal.wachtrij(locatie))
+        time.sleep(hapering)
+    finally:
+        blokkade.rollback()
+        blokkade.close()
+    uitkomsten.append(('kiosk wacht hooguit JOURNAAL_WACHT', True,
+                       max(latencies) < balie4.JOURNAAL_WACHT + 0.5))
+    uitkomsten.append(('wachtrij tijdens hapering', aantal + 1, wachtrij))
+
+    # Database weer bereikbaar: het journaal loopt leeg
+    journaal._wekker.set()
+    deadline = time.monotonic() + 30
+    while journaal.wachtrij(locatie) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    uitkomsten.append(('journaal verwerkt', [], journaal.wachtrij(locatie)))
+    totaal, actief, _ = balie4.tel_bezoekers(locatie=locatie)
+    uitkomsten.append(('niets verloren, niets dubbel (totaal, actief)', (aantal + 1, aantal), (totaal, actief)))
+
+    # Dezelfde aanmelding nog een keer (zoals een tweede proces op hetzelfde journaal)
+    bezoeker = balie4.zoek_actieve_bezoeker("kiosk1@bedrijf.nl", locatie=locatie)[0]
+    uitkomsten.append(('dubbel verwerkt, zelfde id', bezoeker.id, registreer(1)))
+
+    # De receptie meldt eerst af, de afmelding uit het journaal komt later binnen
+    balie4.checkout_bezoeker(bezoeker.id, locatie=locatie)
+    eerste_afmelding = balie4.haal_bezoeker(bezoeker.id, locatie=locatie).tijdstip_uit
+    time.sleep(1.1)
+    uitkomsten.append(('afmelding na de receptie', (0, eerste_afmelding), (
+        balie4.checkout_via_journaal(bezoeker.id, locatie=locatie),
+        balie4.haal_bezoeker(bezoeker.id, locatie=locatie).tijdstip_uit,
+    )))
+    # Een kapotte regel tussen twee goede: alleen die regel mislukt
+    journaal.schrijf(locatie, 'aanmelden', {'sleutel': 'kapot'})
+    uitkomsten.append(('regel na een kapotte regel', True, isinstance(registreer(aantal + 1), int)))
+    uitkomsten.append(('kapotte regel in journaal_mislukt (soort, wachtrij)', (['aanmelden'], []),
+                       ([regel['soort'] for regel in journaal.mislukt(locatie)], journaal.wachtrij(locatie))))
+    latencies.sort()
+    uitkomsten.append(('latency tijdens hapering (ms, p50 / max)', None,
+                       f"{latencies[len(latencies) // 2] * 1000:.1f} / {latencies[-1] * 1000:.0f}"))
+    return uitkomsten
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Controleer het kiosk journaal met een haperende database")
+    parser.add_argument('--aanmeldingen', type=int, default=20, help="Aanmeldingen tijdens de hapering")
+    parser.add_argument('--hapering', type=float, default=3.0, help="Extra seconden dat de database hapert")
+    args = parser.parse_args()
+
+    for variabele in ('BALIE_DATABASE_URL', 'BALIE_LOCATIES', 'BALIE_SLEUTEL', 'BALIE_JOURNAAL',
+                      'BALIE_SMTP_HOST', 'BALIE_WEBHOOK_URL'):
+        os.environ.pop(variabele, None)
+    # Korte busy timeout: de hapering duurt langer dan alle nieuwe pogingen samen
+    os.environ['BALIE_SQLITE_BUSY_TIMEOUT'] = '0.2'
+    logging.getLogger('balie').setLevel(logging.CRITICAL)
+
+    # De evacuatie-thread (daemon) kan tijdens het opruimen nog een snapshot schrijven
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        os.chdir(tmp)
+        os.environ['BALIE_EVACUATIE_MAP'] = os.path.join(tmp, 'evacuatie')
+        import balie4
+        balie4.JOURNAAL_POLL_SECONDEN = 0.2
+        balie4.get_database(balie4.STANDAARD_LOCATIE)
+        uitkomsten = controles(balie4, args.aanmeldingen, args.hapering)
+        balie4.get_database(balie4.STANDAARD_LOCATIE).close()
+        os.chdir(REPO_ROOT)
+
+    fouten = 0
+    for naam, verwacht, gekregen in uitkomsten:
+        if verwacht is None:
+            print(f"[INFO] {naam}: {gekregen}")
+            continue
+        ok = verwacht == gekregen
+        fouten += not ok
+        print(f"[{'OK' if ok else 'FOUT':>4}] {naam}")
+        if not ok:
+            print(f"         verwacht {verwacht!r}, kreeg {gekregen!r}")
+    print(f"\n{fouten} controle(s) mislukt" if fouten else "\nAlle controles geslaagd")
+    return 1 if fouten else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+QUERY PLAN CHECK
+================
+
+Verzamelt alle SQL statements die de data functies van balie4.py uitvoeren
+(via de trace callback van de gedeelde verbinding) op een gevulde tijdelijke
+database en draait EXPLAIN QUERY PLAN op elk statement.
+
+Statements van de hot paths (actieve lijst, zoeken, afmelden op id, tellers,
+aanmelden, dubbele aanmelding, terugkerende bezoeker, bezoeken per host, notificatie outbox,
+bezetting per uur, anonimiseren) mogen geen SCAN bevatten: ze moeten een index of de primary key
+gebruiken. Zo komt een full table scan niet ongemerkt terug als het schema
+verandert.
+
+GEBRUIK:
+--------
+   python benchmarks/check_queryplans.py
+   python benchmarks/check_queryplans.py --rijen 50000 --verbose
+
+De exit code is 1 als een hot-path query een SCAN gebruikt.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def vul_database(balie4, rijen):
+    """Vul de database met bezoekers: ~5% actief, de rest uitgecheckt, een deel gearchiveerd"""
+    rng = random.Random(42)
+    start = datetime.now() - timedelta(days=400)
+    records, trigrammen = [], []
+    for i in range(rijen):
+        tijdstip_in = start + timedelta(minutes=i * 10)
+        actief = rng.random() < 0.05
+        naam, email, telefoon = f"Bezoeker {i}", f"bezoeker{i}@bedrijf.nl", f"06{i:08d}"
+        records.append((
+            i + 1, *balie4._versleutel_pii(naam, email, telefoon), *balie4._blind_indexen(email, telefoon),
+            f"Bedrijf {i % 50}", f"Host {i % 30}", "Overleg", tijdstip_in.strftime('%Y-%m-%d %H:%M:%S'),
+            None if actief else (tijdstip_in + timedelta(hours=2)).strftime('%Y-%m-%d %H:%M:%S'),
+            'actief' if actief else 'uitgecheckt', os.urandom(16).hex(),
+        ))
+        if actief:
+            trigrammen.extend((trigram, i + 1) for trigram in balie4.naam_trigrammen(naam))
+    with balie4.db_transactie() as c:
+        c.executemany(
+            """INSERT INTO bezoekers (id, naam, email, telefoon, email_index, telefoon_index, bedrijf, bezoekt,
+                                      reden, tijdstip_in, tijdstip_uit, status, afmeld_token)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            records
+        )
+        c.executemany("INSERT INTO naam_trigrammen (trigram, bezoeker_id) VALUES (?, ?)", trigrammen)
+    balie4.archiveer_bezoekers(dagen=200)
+
+
+def verzamel_statements(balie4, scenario):
+    """Voer een scenario uit en verzamel de uitgevoerde SQL (met ingevulde parameters)"""
+    conn = balie4.get_database()
+    statements = []
+
+    def trace(sql):
+        # Trigger-stappen ('-- TRIGGER ...'), transacties en PRAGMA's hebben geen query plan
+        eerste_woord = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+        if eerste_woord in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE'):
+            statements.append(sql)
+
+    conn.set_trace_callback(trace)
+    try:
+        resultaat = scenario()
+        if hasattr(resultaat, '__next__'):
+            for _ in resultaat:
+                pass
+    finally:
+        conn.set_trace_callback(None)
+    # Triggers melden het buitenste statement per rij opnieuw: ontdubbelen, volgorde behouden
+    return list(dict.fromkeys(statements))
+
+
+def query_plan(balie4, sql):
+    with balie4.db_transactie() as c:
+        return [rij[3] for rij in c.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+
+
+def scenarios(balie4):
+    """(naam, hot_path, functie); hot paths mogen geen SCAN gebruiken"""
+    actief_id, tweede_id = [bezoeker.id for bezoeker in balie4.haal_actieve_bezoekers()[:2]]
+    vandaag = datetime.now().strftime('%Y-%m-%d')
+    return [
+        ('aanmelden', True, lambda: balie4.voeg_bezoeker_toe(
+            "Jan Jansen", "jan@bedrijf.nl", "0612345678", "ABC", "Piet", "Overleg", sleutel="formulier-1")),
+        ('dubbele aanmelding', True, lambda: balie4.voeg_bezoeker_toe(
+            "Jan Jansen", "jan@bedrijf.nl", "0612345678", "ABC", "Piet", "Overleg", sleutel="formulier-1")),
+        ('groepsaanmelding', True, lambda: balie4.voeg_groep_toe(
+            ["Jan Jansen", "Kees de Vries", "Fatima El Amrani"], "jan@bedrijf.nl", "0612345678", "ABC", "Piet",
+            "Rondleiding", sleutel="groep-1")),
+        ('groep afmelden', True, lambda: balie4.checkout_groep("groep-1")),
+        ('actieve lijst', True, balie4.haal_actieve_bezoekers),
+        ('zoeken', True, lambda: balie4.zoek_actieve_bezoeker("Bezoeker 1")),
+        ('zoeken op e-mail', True, lambda: balie4.zoek_actieve_bezoeker("bezoeker7@bedrijf.nl")),
+        ('zoeken op telefoon', True, lambda: balie4.zoek_actieve_bezoeker("06 0000 0007")),
+        ('afmelden op id', True, lambda: balie4.checkout_bezoeker(actief_id)),
+        ('afmelden met QR-code', True, lambda: balie4.checkout_op_token(balie4.haal_afmeld_token(tweede_id))),
+        ('tellers', True, balie4.tel_bezoekers),
+        ('profiel op e-mail', True, lambda: balie4.zoek_profiel("Bezoeker7@bedrijf.nl")),
+        ('profiel op telefoon', True, lambda: balie4.zoek_profiel("+316 0000 0007")),
+        ('bezoeken per host', True, lambda: balie4.haal_alle_bezoekers(host_id=7, inclusief_archief=True)),
+        ('notificaties versturen', True, balie4.verstuur_notificaties),
+        ('bezetting per uur', True, lambda: balie4.haal_bezetting(vandaag, vandaag)),
+        ('geschiedenis (status)', False, lambda: balie4.haal_alle_bezoekers('uitgecheckt')),
+        ('geschiedenis (met archief)', False, lambda: balie4.haal_alle_bezoekers(inclusief_archief=True)),
+        # De tabel in de app: één pagina, nieuwste eerst. Een SCAN over idx_*_tijdstip_in in
+        # volgorde, die na de pagina stopt (LIMIT); geen sortering van de hele geschiedenis
+        ('geschiedenis (pagina)', False, lambda: balie4.haal_alle_bezoekers(
+            inclusief_archief=True, limiet=balie4.GESCHIEDENIS_PAGINA, vanaf=balie4.GESCHIEDENIS_PAGINA)),
+        ('archiveren', False, lambda: balie4.archiveer_bezoekers(dagen=100)),
+        ('archief opschonen', False, lambda: balie4.purge_archief(dagen=300, pauze=0)),
+        # Batches van het anonimiseren lopen naast de kiosks: ook via indexen
+        ('anonimiseren', True, lambda: balie4.anonimiseer_bezoekers(dagen=250, pauze=0)),
+        ('bezetting herberekenen', False, balie4.herbereken_bezetting),
+        ('bezoekduur per bedrijf', False, lambda: balie4.bezoekduur_statistieken('bedrijf', '2000-01-01', vandaag)),
+        ('bezoekers per maand', False, lambda: balie4.bezoekers_per_periode('2000-01-01', vandaag, 'maand')),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN check voor alle SQL van balie4.py")
+    parser.add_argument('--rijen', type=int, default=10000, help="Aantal bezoekers in de testdatabase")
+    parser.add_argument('--verbose', action='store_true', help="Toon het plan van elk statement")
+    args = parser.parse_args()
+
+    # De evacuatie-thread (daemon) kan tijdens het opruimen nog een snapshot schrijven
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        # DB_PAD is relatief: de testdatabase komt in de tijdelijke map
+        os.chdir(tmp)
+        os.environ['BALIE_EVACUATIE_MAP'] = os.path.join(tmp, 'evacuatie')
+        import balie4
+
+        vul_database(balie4, args.rijen)
+        # Eenmalige laadacties per proces (zoals de host index) horen niet bij de hot paths
+        balie4.host_index()
+
+        fouten = []
+        for naam, hot_path, scenario in scenarios(balie4):
+            for sql in verzamel_statements(balie4, scenario):
+                plan = query_plan(balie4, sql)
+                scans = [stap for stap in plan if stap.startswith('SCAN ')]
+                status = 'OK'
+                if scans and hot_path:
+                    status = 'FOUT'
+                    fouten.append((naam, sql, scans))
+                elif scans:
+                    status = 'scan'
+                print(f"[{status:>4}] {naam}: {' '.join(sql.split())[:100]}")
+                if args.verbose or status == 'FOUT':
+                    for stap in plan:
+                        print(f"         {stap}")
+
+        if fouten:
+            print(f"\n{len(fouten)} hot-path statement(s) gebruiken een SCAN in plaats van een index")
+            return 1
+        print("\nAlle hot-path statements gebruiken een index")
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+MULTI-PROCES STRESSTEST
+=======================
+
+Start N processen die tegelijk op dezelfde SQLite database aanmelden, afmelden en
+lezen, zoals N Streamlit workers achter een reverse proxy (zie balie_workers.py).
+Alle processen openen de nieuwe database op hetzelfde moment: het schema, de
+migraties en de sleutel worden dus ook gelijktijdig aangemaakt.
+
+Daarna controleert de test dat er geen registratie verloren is gegaan: elk id dat
+voeg_bezoeker_toe teruggaf staat in de database (en niets anders), elke aanmelding
+heeft een profiel, de afmeldingen zijn verwerkt en de tellers (triggers) kloppen
+met de tabel.
+
+GEBRUIK:
+--------
+   python benchmarks/stress_multiproces.py
+   python benchmarks/stress_multiproces.py --processen 8 --aanmeldingen 500
+
+De exit code is 1 als een controle faalt of een proces een fout kreeg.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+class _TelBezet(logging.Handler):
+    """Telt de 'Database bezet' waarschuwingen (nieuwe pogingen met backoff)"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.aantal = 0
+
+    def emit(self, record):
+        if record.getMessage().startswith("Database bezet"):
+            self.aantal += 1
+
+
+def werker(nummer, aantal, map_, start, resultaten):
+    """Eén proces: `aantal` aanmeldingen, elke derde meteen weer afgemeld, en af en toe
+    de actieve lijst en een zoekopdracht, zoals een kiosk en een receptiescherm"""
+    os.chdir(map_)
+    import balie4
+
+    bezet = _TelBezet()
+    logging.getLogger('balie').addHandler(bezet)
+    ids, afgemeld, fouten, latencies = [], 0, [], []
+    start.wait()
+    for i in range(aantal):
+        try:
+            begin = time.perf_counter()
+            bezoeker_id = balie4.voeg_bezoeker_toe(
+                f"Stress {nummer} {i}", f"stress{nummer}-{i}@bedrijf.nl", f"06{nummer:02d}{i:06d}",
+                "Stress BV", "Piet Pieters", "Stresstest", locatie=balie4.STANDAARD_LOCATIE)
+            latencies.append(time.perf_counter() - begin)
+            ids.append(bezoeker_id)
+            if i % 3 == 0:
+                afgemeld += balie4.checkout_bezoeker(bezoeker_id, locatie=balie4.STANDAARD_LOCATIE)
+            if i % 10 == 0:
+                balie4.haal_actieve_bezoekers(locatie=balie4.STANDAARD_LOCATIE)
+                balie4.zoek_actieve_bezoeker(f"Stress {nummer}", locatie=balie4.STANDAARD_LOCATIE)
+        except Exception as e:
+            fouten.append(f"{type(e).__name__}: {e}")
+    resultaten.put((nummer, ids, afgemeld, fouten, bezet.aantal, latencies))
+
+
+def controleer(balie4, ids, afgemeld):
+    """(naam, verwacht, gekregen) per controle op de database na afloop"""
+    with balie4.db_transactie(balie4.STANDAARD_LOCATIE, alleen_lezen=True) as c:
+        in_database = sorted(rij[0] for rij in c.execute("SELECT id FROM bezoekers"))
+        profielen = c.execute("SELECT COUNT(*) FROM bezoeker_profielen").fetchone()[0]
+        uitgecheckt = c.execute("SELECT COUNT(*) FROM bezoekers WHERE status = 'uitgecheckt'").fetchone()[0]
+        tellers = dict(c.execute("SELECT status, aantal FROM tellers WHERE tabel = 'bezoekers' AND aantal > 0"))
+        per_status = dict(c.execute("SELECT status, COUNT(*) FROM bezoekers GROUP BY status"))
+        journal_mode = c.execute("PRAGMA journal_mode").fetchone()[0]
+    return [
+        ('ids uniek', len(ids), len(set(ids))),
+        ('geen registratie verloren', sorted(ids), in_database),
+        ('profielen', len(ids), profielen),
+        ('afgemeld', afgemeld, uitgecheckt),
+        ('tellers', per_status, tellers),
+        ('journal mode', 'wal', journal_mode),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stresstest: meerdere processen op één SQLite database")
+    parser.add_argument('--processen', type=int, default=4)
+    parser.add_argument('--aanmeldingen', type=int, default=200, help="Aanmeldingen per proces")
+    args = parser.parse_args()
+
+    # Eigen database en sleutel: ook in de werkers (spawn erft de omgeving)
+    for variabele in ('BALIE_DATABASE_URL', 'BALIE_LOCATIES', 'BALIE_SLEUTEL', 'BALIE_SMTP_HOST', 'BALIE_WEBHOOK_URL'):
+        os.environ.pop(variabele, None)
+
+    # De evacuatie-thread (daemon) kan tijdens het opruimen nog een snapshot schrijven
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        os.environ['BALIE_EVACUATIE_MAP'] = os.path.join(tmp, 'evacuatie')
+        ctx = multiprocessing.get_context('spawn')
+        start = ctx.Barrier(args.processen)
+        resultaten = ctx.Queue()
+        processen = [
+            ctx.Process(target=werker, args=(nummer, args.aanmeldingen, tmp, start, resultaten))
+            for nummer in range(args.processen)
+        ]
+        begin = time.perf_counter()
+        for proces in processen:
+            proces.start()
+        per_proces = sorted(resultaten.get(timeout=600) for _ in processen)
+        for proces in processen:
+            proces.join()
+        duur = time.perf_counter() - begin
+
+        ids = [id_ for _, proces_ids, _, _, _, _ in per_proces for id_ in proces_ids]
+        afgemeld = sum(aantal for _, _, aantal, _, _, _ in per_proces)
+        fouten = [(nummer, fout) for nummer, _, _, proces_fouten, _, _ in per_proces for fout in proces_fouten]
+        bezet = sum(aantal for _, _, _, _, aantal, _ in per_proces)
+        latencies = sorted(l for *_, proces_latencies in per_proces for l in proces_latencies)
+
+        os.chdir(tmp)
+        import balie4
+        uitkomsten = controleer(balie4, ids, afgemeld)
+        balie4.get_database(balie4.STANDAARD_LOCATIE).close()
+        os.chdir(REPO_ROOT)
+
+    print(f"{args.processen} processen x {args.aanmeldingen} aanmeldingen: {len(ids)} in {duur:.1f} s "
+          f"(inclusief opstarten)")
+    if latencies:
+        kwantiel = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+        print(f"aanmelden: p50 {kwantiel(0.5):.1f} ms, p95 {kwantiel(0.95):.1f} ms, "
+              f"max {latencies[-1] * 1000:.1f} ms; {bezet} keer opnieuw geprobeerd na SQLITE_BUSY")
+    mislukt = len(fouten)
+    for nummer, fout in fouten[:10]:
+        print(f"[FOUT] proces {nummer}: {fout}")
+    for naam, verwacht, gekregen in uitkomsten:
+        ok = verwacht == gekregen
+        mislukt += not ok
+        print(f"[{'OK' if ok else 'FOUT':>4}] {naam}")
+        if not ok and naam != 'geen registratie verloren':
+            print(f"         verwacht {verwacht!r}, kreeg {gekregen!r}")
+        elif not ok:
+            print(f"         {len(set(verwacht) - set(gekregen))} ontbreken, "
+                  f"{len(set(gekregen) - set(verwacht))} onverwacht")
+
+    print(f"\n{mislukt} fout(en)" if mislukt else "\nGeen registratie verloren")
+    return 1 if mislukt else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())